@@ -10,7 +10,7 @@ df = pd.read_excel(sys.argv[1])
 print("All transactions:")
 print("=" * 100)
 for idx, row in df.iterrows():
-    print(f"{idx+1:2d}. {row['Data']} | {row['Kwota']:>15s} | {row['Kontahent / Numer rachunku'][:40]}")
+    print(f"{idx+1:2d}. {row['Data']} | {row['Kwota']:>15,.2f} | {row['Kontahent / Numer rachunku'][:40]}")
 
 print("=" * 100)
 print(f"\nTotal: {len(df)} transactions")
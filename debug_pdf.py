@@ -5,10 +5,13 @@ import sys
 import pdfplumber
 
 if len(sys.argv) < 2:
-    print("Usage: python debug_pdf.py <pdf_file>")
+    print("Usage: python debug_pdf.py <pdf_file> [--tables]")
     sys.exit(1)
 
-pdf_path = sys.argv[1]
+# Table extraction is by far the slowest part, so only run it on request
+show_tables = '--tables' in sys.argv
+args = [arg for arg in sys.argv[1:] if arg != '--tables']
+pdf_path = args[0]
 
 print(f"Opening: {pdf_path}")
 print("=" * 80)
@@ -25,8 +28,8 @@ with pdfplumber.open(pdf_path) as pdf:
         else:
             print("(No text found)")
         
-        # Also try to extract tables
-        tables = page.extract_tables()
+        # Also try to extract tables (only with --tables; it is slow)
+        tables = page.extract_tables() if show_tables else None
         if tables:
             print(f"\n{'-'*80}")
             print(f"TABLES FOUND: {len(tables)}")
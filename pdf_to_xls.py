@@ -8,172 +8,297 @@ Converts Polish bank statements to Excel format with columns:
 - Kwota (Amount)
 """
 
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from pathlib import Path
 import pdfplumber
 import pandas as pd
-from decimal import Decimal
 
+# Pattern for transaction line number at start (e.g., "1 01.09.2025")
+# This helps us identify where a new transaction starts
+_TX_START = re.compile(r'^(\d+)\s+(\d{2}\.\d{2}\.\d{4})\s+')
 
-def extract_transactions_from_pdf(pdf_path):
+# Pattern for amount with PLN
+# Matches: "1 579,00 PLN" or "579,00 PLN" or "18 000,00 PLN"
+# Amount can have spaces as thousand separators (every 3 digits from right)
+# Must be preceded by whitespace or start, followed by " PLN"
+_AMOUNT = re.compile(r'(?:^|\s)(-?\d{1,3}(?:\s\d{3})*,\d{2})\s+PLN')
+
+# Pattern for Polish account number (26 digits, sometimes with spaces)
+_ACCOUNT = re.compile(r'\b\d{2}\s?\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\b')
+
+# Quick probe for a DD.MM.YYYY date anywhere on a page
+_DATE_PROBE = re.compile(r'\d{2}\.\d{2}\.\d{4}')
+
+# Output column order for the generated Excel files
+_COLUMNS = ['Data', 'Kontahent / Numer rachunku', 'Opis / Typ transakcji', 'Kwota']
+
+_DIGITS = '0123456789'
+
+# Wall-clock budget per page for pdfplumber text extraction; some
+# pathological PDFs can hang pdfminer for minutes, so after this long
+# the page is retried with PyMuPDF instead
+_PAGE_TIMEOUT = 5.0
+
+
+def _parse_amount(s):
+    """
+    Parse a Polish-formatted amount ("1 579,00" or "-2 500,50") into a
+    float so the Excel cell is a real number rather than text.
+    """
+    return float(s.replace(' ', '').replace(',', '.'))
+
+
+def _strip_trailing_pln(s):
+    """
+    Strip a trailing balance amount (e.g. "XXX XXX,XX PLN") from a line.
+
+    Equivalent to re.sub(r'\\s*\\d[\\d\\s]*,\\d{2}\\s+PLN\\s*$', '', s)
+    but implemented as a plain character scan, which is much cheaper
+    than a regex invocation in the per-line hot loop.
+    """
+    # Trim trailing whitespace and require the line to end with "PLN"
+    end = len(s)
+    while end and s[end - 1] in ' \t':
+        end -= 1
+    if s[end - 3:end] != 'PLN':
+        return s
+
+    # Require whitespace between the amount and "PLN"
+    ws = end - 3
+    while ws and s[ws - 1] in ' \t':
+        ws -= 1
+    if ws == end - 3:
+        return s
+
+    # The amount must end with ",dd"
+    if ws < 4 or s[ws - 3] != ',' or s[ws - 2] not in _DIGITS or s[ws - 1] not in _DIGITS:
+        return s
+
+    # Scan back over the integer part (digits with space separators),
+    # which needs at least one digit
+    q = ws - 3
+    has_digit = False
+    while q and s[q - 1] in '0123456789 \t':
+        if s[q - 1] not in ' \t':
+            has_digit = True
+        q -= 1
+    if not has_digit:
+        return s
+
+    return s[:q]
+
+
+def _extract_page_texts(pdf_path, backend='pdfplumber'):
+    """
+    Extract the text of every page of a PDF in one pass.
+
+    The PDF is opened exactly once and closed before returning, so
+    callers only ever work with plain strings.
+
+    Args:
+        pdf_path: Path to the PDF file
+        backend: Text extraction backend, 'pdfplumber' or 'pymupdf'
+
+    Returns:
+        List of page text strings (entries may be None or empty for
+        pages without text)
+    """
+    if backend == 'pymupdf':
+        import pymupdf
+        with pymupdf.open(pdf_path) as doc:
+            return [page.get_text() for page in doc]
+
+    # Run each page's extract_text in a worker thread so a pathological
+    # page cannot hang the conversion; on timeout the page is re-read
+    # with PyMuPDF, whose C parser copes with degenerate content streams
+    executor = ThreadPoolExecutor(max_workers=1)
+    fallback_doc = None
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            page_texts = []
+            for page_num, page in enumerate(pdf.pages):
+                future = executor.submit(page.extract_text)
+                try:
+                    text = future.result(timeout=_PAGE_TIMEOUT)
+                except FuturesTimeoutError:
+                    print(f"  ⚠ Warning: page {page_num + 1} timed out after "
+                          f"{_PAGE_TIMEOUT:.0f}s, retrying with PyMuPDF")
+                    # The worker thread may be stuck inside pdfminer, so
+                    # abandon this executor and start a fresh one
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = ThreadPoolExecutor(max_workers=1)
+                    if fallback_doc is None:
+                        import pymupdf
+                        fallback_doc = pymupdf.open(pdf_path)
+                    text = fallback_doc[page_num].get_text()
+                else:
+                    # Drop the cached layout objects for this page so long
+                    # statements don't accumulate them in memory
+                    page.flush_cache()
+                    page.get_textmap.cache_clear()
+                page_texts.append(text)
+            return page_texts
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if fallback_doc is not None:
+            fallback_doc.close()
+
+
+def extract_transactions_from_pdf(pdf_path, backend='pdfplumber'):
     """
     Extract transaction data from a PDF bank statement.
-    
+
     Args:
         pdf_path: Path to the PDF file
-        
+        backend: Text extraction backend, 'pdfplumber' (default) or
+            'pymupdf' (much faster for plain text extraction)
+
+    Returns:
+        List of dictionaries containing transaction data
+    """
+    # Text extraction dominates the regex parsing cost, so acquire all
+    # page texts first and run the pure-string parser over the result
+    page_texts = _extract_page_texts(pdf_path, backend=backend)
+    return _parse_page_texts(page_texts)
+
+
+def _parse_page_texts(page_texts):
+    """
+    Parse extracted page texts into transaction dictionaries.
+
+    Pure string processing — no PDF access — so it can be exercised
+    directly and is independent of the extraction backend.
+
+    Args:
+        page_texts: List of page text strings
+
     Returns:
         List of dictionaries containing transaction data
     """
     transactions = []
-    
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, 1):
-            text = page.extract_text()
-            
-            if not text:
+
+    for text in page_texts:
+        if not text:
+            continue
+
+        # Title/summary/terms pages carry no transactions; a C-level
+        # substring scan is far cheaper than parsing them line by line
+        if ' PLN' not in text or not _DATE_PROBE.search(text):
+            continue
+
+        # Split text into lines, stripping each once up front so the
+        # parser below never re-strips in the look-ahead
+        lines = [l.strip() for l in text.splitlines()]
+
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+
+            # Transaction lines always start with a digit; this
+            # one-character check skips the regex on everything else
+            if not line or not ('0' <= line[0] <= '9'):
+                i += 1
                 continue
+
+            # Check if this line starts a new transaction
+            match = _TX_START.match(line)
             
-            # Split text into lines
-            lines = text.split('\n')
-            
-            # Pattern for transaction line number at start (e.g., "1 01.09.2025")
-            # This helps us identify where a new transaction starts
-            transaction_start_pattern = r'^(\d+)\s+(\d{2}\.\d{2}\.\d{4})\s+'
-            
-            # Pattern for amount with PLN
-            # Matches: "1 579,00 PLN" or "579,00 PLN" or "18 000,00 PLN"
-            # Amount can have spaces as thousand separators (every 3 digits from right)
-            # Must be preceded by whitespace or start, followed by " PLN"
-            amount_pattern = r'(?:^|\s)(-?\d{1,3}(?:\s\d{3})*,\d{2})\s+PLN'
-            
-            # Pattern for Polish account number (26 digits, sometimes with spaces)
-            account_pattern = r'\b\d{2}\s?\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\b'
-            
-            # Pattern to identify balance line (ends with "PLN" followed by number)
-            balance_pattern = r'\d+,\d{2}\s+PLN\s+\d+,\d{2}\s+PLN'
-            
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
+            if match:
+                date = match.group(2)
+                
+                # Extract rest of the line after the transaction number and date
+                rest_of_line = line[match.end():].strip()
                 
-                # Check if this line starts a new transaction
-                match = re.match(transaction_start_pattern, line)
+                # Initialize transaction data; the description
+                # accumulates as fragments joined once at the end
+                counterparty_name = ""
+                account_number = ""
+                amount = None
+                desc_parts = []
                 
-                if match:
-                    lp = match.group(1)
-                    date = match.group(2)
-                    
-                    # Extract rest of the line after the transaction number and date
-                    rest_of_line = line[match.end():].strip()
-                    
-                    # Initialize transaction data
-                    counterparty_name = ""
-                    counterparty_address = ""
-                    account_number = ""
-                    description = ""
-                    amount = ""
-                    
-                    # The first line contains counterparty name and transaction amount at the end
-                    # Look for amount on this line (first PLN amount is the transaction amount)
-                    amount_matches = list(re.finditer(amount_pattern, rest_of_line))
-                    
-                    if amount_matches:
-                        # Take the FIRST amount (transaction amount, not balance)
-                        first_amount = amount_matches[0]
-                        amount = first_amount.group(1).replace(' ', '')
-                        # Everything before the first amount is part of counterparty name
-                        counterparty_name = rest_of_line[:first_amount.start()].strip()
-                    else:
-                        counterparty_name = rest_of_line
-                    
-                    # Look ahead for continuation lines (address, account, description)
-                    j = i + 1
-                    found_account = False
-                    lines_to_process = []
-                    
-                    # Collect lines until we hit another transaction
-                    while j < len(lines) and j < i + 5:
-                        next_line = lines[j].strip()
-                        
-                        # Stop if we hit another transaction
-                        if re.match(transaction_start_pattern, next_line):
-                            break
-                        
-                        # Stop at page markers
-                        if 'Wyciąg nr' in next_line or 'Dokument wygenerowany' in next_line:
-                            break
-                        
-                        if next_line:
-                            lines_to_process.append(next_line)
-                        
+                # The first line contains counterparty name and transaction amount at the end
+                # Only the FIRST amount matters (transaction amount, not
+                # balance), so search stops at the first hit instead of
+                # materializing a Match object per amount on the line
+                first_amount = _AMOUNT.search(rest_of_line)
+
+                if first_amount:
+                    amount = _parse_amount(first_amount.group(1))
+                    # Everything before the first amount is part of counterparty name
+                    counterparty_name = rest_of_line[:first_amount.start()].strip()
+                else:
+                    counterparty_name = rest_of_line
+                
+                # Scan continuation lines (address, account, description)
+                # in a single pass until we hit another transaction
+                j = i + 1
+                found_account = False
+
+                while j < len(lines) and j < i + 5:
+                    next_line = lines[j]
+
+                    # Stop if we hit another transaction
+                    if _TX_START.match(next_line):
+                        break
+
+                    # Stop at page markers
+                    if 'Wyciąg nr' in next_line or 'Dokument wygenerowany' in next_line:
+                        break
+
+                    if not next_line:
                         j += 1
-                    
-                    # Now process the collected lines
-                    for line_idx, next_line in enumerate(lines_to_process):
-                        # Check for account number
-                        acc_match = re.search(account_pattern, next_line)
-                        if acc_match and not found_account:
-                            account_number = acc_match.group(0).replace(' ', '')
-                            found_account = True
-                            
-                            # Text before account number is likely address
-                            before_acc = next_line[:acc_match.start()].strip()
-                            if before_acc and not counterparty_address:
-                                counterparty_address = before_acc
-                            
-                            # Text after account number is description
-                            after_acc = next_line[acc_match.end():].strip()
-                            # Remove balance amounts from description
-                            # Balance pattern: "XXX XXX,XX PLN" at the end
-                            after_acc = re.sub(r'\s*\d[\d\s]*,\d{2}\s+PLN\s*$', '', after_acc)
-                            if after_acc:
-                                if description:
-                                    description += " " + after_acc
-                                else:
-                                    description = after_acc
-                            continue
-                        
-                        # If we haven't found account yet, might be address continuation
-                        if not found_account:
-                            if counterparty_address:
-                                counterparty_address += " " + next_line
-                            else:
-                                counterparty_address = next_line
-                        else:
-                            # After account, it's description
-                            # Clean up: remove any balance amounts
-                            clean_line = re.sub(r'\s*\d[\d\s]*,\d{2}\s+PLN\s*$', '', next_line)
-                            if clean_line:
-                                if description:
-                                    description += " " + clean_line
-                                else:
-                                    description = clean_line
-                    
-                    # Build counterparty field
-                    counterparty_parts = []
-                    if counterparty_name:
-                        counterparty_parts.append(counterparty_name)
-                    if account_number:
-                        counterparty_parts.append(account_number)
-                    
-                    counterparty = " / ".join(counterparty_parts) if counterparty_parts else ""
-                    
-                    if amount:  # Only add if we found an amount
-                        transaction = {
-                            'Data': date,
-                            'Kontahent / Numer rachunku': counterparty,
-                            'Opis / Typ transakcji': description,
-                            'Kwota': amount
-                        }
-                        transactions.append(transaction)
-                    
-                    # Move to the line where we stopped
-                    i = j - 1
+                        continue
+
+                    # Check for account number
+                    acc_match = _ACCOUNT.search(next_line)
+                    if acc_match and not found_account:
+                        account_number = acc_match.group(0).replace(' ', '')
+                        found_account = True
+
+                        # Text after account number is description (text
+                        # before it is the address, which is not output)
+                        after_acc = next_line[acc_match.end():].strip()
+                        # Remove balance amounts from description
+                        after_acc = _strip_trailing_pln(after_acc)
+                        if after_acc:
+                            desc_parts.append(after_acc)
+                    elif found_account:
+                        # After account, it's description
+                        # Clean up: remove any balance amounts
+                        clean_line = _strip_trailing_pln(next_line)
+                        if clean_line:
+                            desc_parts.append(clean_line)
+                    # Lines before the account number are address
+                    # continuations, which are not part of the output
+
+                    j += 1
                 
-                i += 1
-    
+                description = ' '.join(desc_parts)
+
+                # Build counterparty field
+                if counterparty_name and account_number:
+                    counterparty = counterparty_name + " / " + account_number
+                else:
+                    counterparty = counterparty_name or account_number or ""
+                
+                if amount is not None:  # Only add if we found an amount
+                    transaction = {
+                        'Data': date,
+                        'Kontahent / Numer rachunku': counterparty,
+                        'Opis / Typ transakcji': description,
+                        'Kwota': amount
+                    }
+                    transactions.append(transaction)
+                
+                # Move to the line where we stopped
+                i = j - 1
+            
+            i += 1
+
     return transactions
 
 
@@ -185,14 +310,16 @@ def save_to_excel(transactions, output_path):
         transactions: List of transaction dictionaries
         output_path: Path where to save the Excel file
     """
-    df = pd.DataFrame(transactions)
-    
-    # Ensure columns are in the correct order
-    columns = ['Data', 'Kontahent / Numer rachunku', 'Opis / Typ transakcji', 'Kwota']
-    df = df[columns]
-    
-    # Save to Excel
-    df.to_excel(output_path, index=False, engine='openpyxl')
+    # from_records with an explicit column list skips dtype inference
+    # and the reindex that an after-the-fact df[columns] would cost
+    df = pd.DataFrame.from_records(transactions, columns=_COLUMNS)
+    df['Kwota'] = df['Kwota'].astype('float64')
+
+    # Save to Excel; xlsxwriter serializes much faster than openpyxl.
+    # Note: its constant_memory mode cannot be used here because pandas
+    # writes cell data column by column and constant_memory silently
+    # drops writes to already-flushed rows.
+    df.to_excel(output_path, index=False, engine='xlsxwriter')
     print(f"  ✓ Saved {len(transactions)} transactions to {output_path}")
 
 
@@ -211,7 +338,8 @@ def merge_excel_files(excel_files, output_path):
     
     for excel_file in excel_files:
         try:
-            df = pd.read_excel(excel_file, engine='openpyxl')
+            # calamine (Rust-based reader) parses xlsx much faster than openpyxl
+            df = pd.read_excel(excel_file, engine='calamine')
             all_transactions.append(df)
         except Exception as e:
             print(f"  ⚠ Warning: Could not read {excel_file.name}: {e}")
@@ -222,54 +350,63 @@ def merge_excel_files(excel_files, output_path):
     # Combine all dataframes
     combined_df = pd.concat(all_transactions, ignore_index=True)
     
-    # Sort by date (convert to datetime for proper sorting)
+    # Sort by date: parse the column once (cache=True dedupes repeated
+    # date strings), sort on int64 nanoseconds, and only format back to
+    # strings for writing; mergesort keeps the sort stable
     try:
-        combined_df['Data_Sort'] = pd.to_datetime(combined_df['Data'], format='%d.%m.%Y')
-        combined_df = combined_df.sort_values('Data_Sort')
-        combined_df = combined_df.drop('Data_Sort', axis=1)
+        combined_df['Data'] = pd.to_datetime(combined_df['Data'], format='%d.%m.%Y', cache=True)
+        combined_df = combined_df.sort_values('Data', kind='mergesort')
+        combined_df['Data'] = combined_df['Data'].dt.strftime('%d.%m.%Y')
     except Exception:
         # If date parsing fails, keep original order
         pass
     
     # Save combined file
-    combined_df.to_excel(output_path, index=False, engine='openpyxl')
+    combined_df.to_excel(output_path, index=False, engine='xlsxwriter')
     
     return len(combined_df)
 
 
-def process_single_pdf(pdf_path, output_path=None):
+def process_single_pdf(pdf_path, output_path=None, save_excel=True, backend='pdfplumber'):
     """
     Process a single PDF file and convert to Excel.
-    
+
     Args:
         pdf_path: Path to the PDF file
         output_path: Optional output path for Excel file
-        
+        save_excel: If False, skip writing the per-file Excel output
+            (used when results are merged in memory instead)
+        backend: Text extraction backend, 'pdfplumber' or 'pymupdf'
+
     Returns:
-        True if successful, False otherwise
+        Tuple of (success, transactions) where transactions is the
+        extracted list of dictionaries, or None on failure
     """
     # Determine output path
     if output_path is None:
         output_path = pdf_path.with_suffix('.xlsx')
-    
+
     print(f"Processing: {pdf_path.name}")
-    
+
     try:
         # Extract transactions
-        transactions = extract_transactions_from_pdf(pdf_path)
-        
+        transactions = extract_transactions_from_pdf(pdf_path, backend=backend)
+
         if not transactions:
             print(f"  ⚠ Warning: No transactions found in {pdf_path.name}")
-            return False
-        
+            return False, None
+
         # Save to Excel
-        save_to_excel(transactions, output_path)
-        print(f"  ✓ Created: {output_path.name}")
-        return True
-        
+        if save_excel:
+            save_to_excel(transactions, output_path)
+            print(f"  ✓ Created: {output_path.name}")
+        else:
+            print(f"  ✓ Extracted {len(transactions)} transactions")
+        return True, transactions
+
     except Exception as e:
         print(f"  ✗ Error processing {pdf_path.name}: {e}")
-        return False
+        return False, None
 
 
 def main():
@@ -285,11 +422,27 @@ def main():
         print("\n  Process folder and merge into one file:")
         print("    python pdf_to_xls.py /path/to/folder --merge")
         print("    python pdf_to_xls.py /path/to/folder --merge combined.xlsx")
+        print("\n  Use the faster PyMuPDF text extraction backend:")
+        print("    python pdf_to_xls.py statement.pdf --backend pymupdf")
         sys.exit(1)
     
     # Check for --merge flag
     merge_files = '--merge' in sys.argv
     args = [arg for arg in sys.argv[1:] if arg != '--merge']
+
+    # Check for --backend flag (pdfplumber is the default; pymupdf is
+    # much faster but requires the pymupdf package)
+    backend = 'pdfplumber'
+    if '--backend' in args:
+        idx = args.index('--backend')
+        if idx + 1 >= len(args):
+            print("Error: --backend requires a value (pdfplumber or pymupdf)")
+            sys.exit(1)
+        backend = args[idx + 1]
+        if backend not in ('pdfplumber', 'pymupdf'):
+            print(f"Error: Unknown backend '{backend}' (expected pdfplumber or pymupdf)")
+            sys.exit(1)
+        del args[idx:idx + 2]
     
     if not args:
         print("Error: No input path provided")
@@ -315,39 +468,59 @@ def main():
         
         successful = 0
         failed = 0
-        created_excel_files = []
-        
-        for pdf_file in pdf_files:
-            success = process_single_pdf(pdf_file)
-            if success:
-                successful += 1
-                excel_file = pdf_file.with_suffix('.xlsx')
-                created_excel_files.append(excel_file)
-            else:
-                failed += 1
-            print("-" * 50)
-        
+        all_transactions = []
+
+        # Each PDF is independent, so process them in parallel.
+        # Page parsing is CPU-bound and single-threaded, hence processes
+        # rather than threads.
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            # When merging, keep results in memory instead of writing
+            # per-file Excel outputs that would only be read back
+            futures = {
+                executor.submit(process_single_pdf, pdf_file,
+                                save_excel=not merge_files, backend=backend): pdf_file
+                for pdf_file in pdf_files
+            }
+            for future in as_completed(futures):
+                success, transactions = future.result()
+                if success:
+                    successful += 1
+                    if merge_files:
+                        all_transactions.extend(transactions)
+                else:
+                    failed += 1
+                print("-" * 50)
+
         print("=" * 50)
         print(f"Summary: {successful} successful, {failed} failed")
-        
+
         # Merge files if requested
-        if merge_files and created_excel_files:
+        if merge_files and all_transactions:
             print("=" * 50)
-            print("Merging all Excel files into one combined file...")
-            
+            print("Merging all transactions into one combined file...")
+
             # Determine combined output path
             if len(args) >= 2:
                 combined_output = Path(args[1])
             else:
                 combined_output = input_path / 'combined_all_statements.xlsx'
-            
-            total_transactions = merge_excel_files(created_excel_files, combined_output)
-            
-            if total_transactions > 0:
-                print(f"✓ Combined {len(created_excel_files)} file(s) with {total_transactions} total transactions")
-                print(f"✓ Created: {combined_output}")
-            else:
-                print("✗ Failed to merge files")
+
+            combined_df = pd.DataFrame.from_records(all_transactions, columns=_COLUMNS)
+
+            # Sort by date, keeping the column as datetime64 until the
+            # write (see merge_excel_files for the same approach)
+            try:
+                combined_df['Data'] = pd.to_datetime(combined_df['Data'], format='%d.%m.%Y', cache=True)
+                combined_df = combined_df.sort_values('Data', kind='mergesort')
+                combined_df['Data'] = combined_df['Data'].dt.strftime('%d.%m.%Y')
+            except Exception:
+                # If date parsing fails, keep original order
+                pass
+
+            combined_df.to_excel(combined_output, index=False, engine='xlsxwriter')
+
+            print(f"✓ Combined {successful} file(s) with {len(combined_df)} total transactions")
+            print(f"✓ Created: {combined_output}")
         
         if failed > 0:
             sys.exit(1)
@@ -365,7 +538,7 @@ def main():
             output_path = None
         
         print("=" * 50)
-        success = process_single_pdf(input_path, output_path)
+        success, _ = process_single_pdf(input_path, output_path, backend=backend)
         print("=" * 50)
         
         if not success: